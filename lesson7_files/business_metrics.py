@@ -5,11 +5,115 @@ This module contains all business metric calculations including revenue,
 order metrics, product performance, and customer experience analytics.
 """
 
-from typing import Optional, Dict
+import functools
+from typing import Optional, Dict, Tuple, Union
 
 import pandas as pd
 import numpy as np
 
+# String key columns stored in contiguous Arrow string buffers so that
+# groupby/nunique factorize through pyarrow instead of hashing Python objects
+ARROW_KEY_COLUMNS = ('order_id', 'customer_id', 'product_id')
+
+# Low-cardinality labels stored as categoricals (grouped by integer codes)
+CATEGORY_COLUMNS = ('order_status', 'customer_state', 'product_category_name')
+
+# Small-range integer columns that may contain missing values
+NULLABLE_INT_COLUMNS = {
+    'review_score': 'Int8',
+    'delivery_days': 'Int16'
+}
+
+
+def _nunique_by_group(group_codes: np.ndarray,
+                      value_codes: np.ndarray,
+                      n_groups: int) -> np.ndarray:
+    """
+    Count distinct values per group from integer codes.
+
+    Args:
+        group_codes: Group code for each row (negative for missing)
+        value_codes: Value code for each row (negative for missing)
+        n_groups: Number of groups
+
+    Returns:
+        Array with the number of distinct values in each group
+    """
+    valid = (group_codes >= 0) & (value_codes >= 0)
+    n_values = int(value_codes.max()) + 1 if valid.any() else 1
+
+    # Each distinct (group, value) pair is counted once towards its group
+    pairs = np.unique(group_codes[valid].astype(np.int64) * n_values + value_codes[valid])
+
+    return np.bincount(pairs // n_values, minlength=n_groups)
+
+
+def _sum_count_by_group(group_codes: np.ndarray,
+                        values: np.ndarray,
+                        n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum and count non-missing values per group from integer codes.
+
+    Args:
+        group_codes: Group code for each row (negative for missing)
+        values: Float value for each row (NaN for missing)
+        n_groups: Number of groups
+
+    Returns:
+        Tuple of (sum of values, count of values) arrays indexed by group code
+    """
+    valid = (group_codes >= 0) & ~np.isnan(values)
+    codes = group_codes[valid]
+
+    # bincount returns integers for empty input even when weights are given
+    sums = np.bincount(codes, weights=values[valid], minlength=n_groups).astype(float, copy=False)
+    counts = np.bincount(codes, minlength=n_groups)
+
+    return sums, counts
+
+
+def _fast_median(values: np.ndarray) -> float:
+    """
+    Calculate the median of an array without missing values.
+
+    Uses np.partition (selection in linear time) instead of a full sort.
+
+    Args:
+        values: Array of numeric values
+
+    Returns:
+        Median value (NaN for an empty array)
+    """
+    n = values.size
+    if n == 0:
+        return np.nan
+
+    mid = n // 2
+    if n & 1:
+        return float(np.partition(values, mid)[mid])
+
+    part = np.partition(values, [mid - 1, mid])
+    return float((part[mid - 1] + part[mid]) * 0.5)
+
+
+def _pct_change(values: np.ndarray) -> np.ndarray:
+    """
+    Calculate the percentage change between consecutive values.
+
+    Args:
+        values: Array of float values
+
+    Returns:
+        Array of percentage changes (NaN for the first value)
+    """
+    growth = np.full_like(values, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(values[1:] - values[:-1], values[:-1], out=growth[1:])
+
+    growth *= 100
+    return growth
+
 
 class BusinessMetrics:
     """Calculates various business metrics for e-commerce data."""
@@ -21,7 +125,33 @@ class BusinessMetrics:
         Args:
             sales_data: DataFrame containing merged sales data
         """
-        self.sales_data = sales_data
+        # Keep rows ordered by purchase time so date ranges map to
+        # contiguous slices located by binary search
+        if not sales_data['order_purchase_timestamp'].is_monotonic_increasing:
+            sales_data = sales_data.sort_values('order_purchase_timestamp', kind='stable')
+
+        self.sales_data = self._optimize_dtypes(sales_data)
+
+        # Positional row labels let filtered views address the cached codes
+        self.sales_data.index = pd.RangeIndex(len(self.sales_data))
+        self._order_id_codes, _ = self._encode(self.sales_data['order_id'])
+        self._ts_index = sales_data['order_purchase_timestamp'].values
+
+        # Missing timestamps sort last; ranges open at the top stop before them
+        self._ts_end = int(np.searchsorted(self._ts_index, np.datetime64('NaT'), side='left'))
+
+        # Row positions for each year, used by the YoY and MoM calculations
+        self._year_groups = (
+            self.sales_data.groupby('year', sort=False).indices
+            if 'year' in self.sales_data.columns else {}
+        )
+
+        # Per-order totals with purchase year, built on first YoY AOV request
+        self._order_totals: Optional[pd.DataFrame] = None
+
+        # Row selections per (start_date, end_date, required_column), shared by
+        # every metric computed for the same dashboard date range
+        self._filter_indices = functools.lru_cache(maxsize=32)(self._compute_filter_indices)
 
     def calculate_total_revenue(self,
                                start_date: Optional[str] = None,
@@ -36,7 +166,7 @@ class BusinessMetrics:
         Returns:
             Total revenue in the period
         """
-        data = self._filter_by_date(self.sales_data, start_date, end_date)
+        data = self._filter_by_date(start_date, end_date)
         return data['price'].sum()
 
     def calculate_revenue_by_period(self,
@@ -54,7 +184,7 @@ class BusinessMetrics:
         Returns:
             DataFrame with revenue by period
         """
-        data = self._filter_by_date(self.sales_data, start_date, end_date)
+        data = self._filter_by_date(start_date, end_date)
 
         # Map period to pandas frequency
         period_map = {
@@ -67,12 +197,12 @@ class BusinessMetrics:
 
         freq = period_map.get(period, 'M')
 
-        # Create period column
-        data_copy = data.copy()
-        data_copy['period'] = data_copy['order_purchase_timestamp'].dt.to_period(freq)
+        # Group by the period Series directly instead of adding a column
+        periods = data['order_purchase_timestamp'].dt.to_period(freq).rename('period')
 
-        # Aggregate revenue
-        revenue_by_period = data_copy.groupby('period')['price'].agg([
+        # Aggregate revenue; rows are already in time order, so groups come
+        # out chronologically without sorting the keys
+        revenue_by_period = data.groupby(periods, sort=False)['price'].agg([
             ('revenue', 'sum'),
             ('order_count', 'count'),
             ('avg_order_value', 'mean')
@@ -98,8 +228,8 @@ class BusinessMetrics:
         Returns:
             Dictionary with YoY metrics
         """
-        current_data = self.sales_data[self.sales_data['year'] == current_year]
-        previous_data = self.sales_data[self.sales_data['year'] == previous_year]
+        current_data = self._rows_for_year(current_year)
+        previous_data = self._rows_for_year(previous_year)
 
         if metric == 'revenue':
             current_value = current_data['price'].sum()
@@ -108,8 +238,13 @@ class BusinessMetrics:
             current_value = current_data['order_id'].nunique()
             previous_value = previous_data['order_id'].nunique()
         elif metric == 'avg_order_value':
-            current_value = current_data.groupby('order_id')['price'].sum().mean()
-            previous_value = previous_data.groupby('order_id')['price'].sum().mean()
+            order_totals = self._get_order_totals()
+            current_value = order_totals.loc[
+                order_totals['year'] == current_year, 'order_price'
+            ].mean()
+            previous_value = order_totals.loc[
+                order_totals['year'] == previous_year, 'order_price'
+            ].mean()
         else:
             raise ValueError(f"Unknown metric: {metric}")
 
@@ -139,28 +274,41 @@ class BusinessMetrics:
         Returns:
             DataFrame with monthly metrics and growth rates
         """
-        year_data = self.sales_data[self.sales_data['year'] == year].copy()
+        year_data = self._rows_for_year(year)
 
-        monthly_metrics = year_data.groupby('month').agg({
-            'price': 'sum',
-            'order_id': 'nunique'
-        }).rename(columns={'price': 'revenue', 'order_id': 'order_count'})
+        # Months 1-12 double as group codes, so the monthly table is built
+        # with bincount kernels instead of a groupby dispatch
+        month_codes = year_data['month'].to_numpy(dtype=np.int64)
+        months = self._observed_groups(month_codes, 13)
 
-        # Calculate MoM growth
-        monthly_metrics['revenue_mom_growth'] = monthly_metrics['revenue'].pct_change() * 100
-        monthly_metrics['orders_mom_growth'] = monthly_metrics['order_count'].pct_change() * 100
-
-        # Calculate average order value
-        monthly_metrics['avg_order_value'] = (
-            monthly_metrics['revenue'] / monthly_metrics['order_count']
+        revenue, _ = _sum_count_by_group(
+            month_codes, year_data['price'].to_numpy(dtype=float, na_value=np.nan), 13
         )
+        revenue = revenue[months]
+        order_count = _nunique_by_group(
+            month_codes, self._order_id_codes[year_data.index.to_numpy()], 13
+        )[months]
+
+        columns = {
+            'revenue': revenue,
+            'order_count': order_count,
+            # Calculate MoM growth
+            'revenue_mom_growth': _pct_change(revenue),
+            'orders_mom_growth': _pct_change(order_count.astype(float)),
+            # Calculate average order value
+            'avg_order_value': revenue / order_count
+        }
 
         if smoothing:
             # Apply 3-month moving average
-            monthly_metrics['revenue_ma3'] = monthly_metrics['revenue'].rolling(window=3).mean()
-            monthly_metrics['revenue_ma3_growth'] = (
-                monthly_metrics['revenue_ma3'].pct_change() * 100
-            )
+            revenue_ma3 = np.full_like(revenue, np.nan)
+            cumulative = np.concatenate(([0.0], np.cumsum(revenue)))
+            revenue_ma3[2:] = (cumulative[3:] - cumulative[:-3]) / 3
+
+            columns['revenue_ma3'] = revenue_ma3
+            columns['revenue_ma3_growth'] = _pct_change(revenue_ma3)
+
+        monthly_metrics = pd.DataFrame(columns, index=pd.Index(months, name='month'))
 
         return monthly_metrics.reset_index()
 
@@ -184,19 +332,30 @@ class BusinessMetrics:
                 "Product category information not available in sales data"
             )
 
-        data = self._filter_by_date(self.sales_data, start_date, end_date)
+        data = self._filter_by_date(start_date, end_date)
 
-        category_metrics = data.groupby('product_category_name').agg({
-            'price': ['sum', 'mean', 'count'],
-            'order_id': 'nunique',
-            'product_id': 'nunique'
-        })
+        group_codes, categories = self._encode(data['product_category_name'])
+        n_groups = len(categories)
+        observed = self._observed_groups(group_codes, n_groups)
 
-        # Flatten column names
-        category_metrics.columns = [
-            'revenue', 'avg_price', 'items_sold',
-            'order_count', 'unique_products'
-        ]
+        # Sum, mean and count all come from the same two bincount passes
+        revenue, items_sold = _sum_count_by_group(
+            group_codes, data['price'].to_numpy(dtype=float, na_value=np.nan), n_groups
+        )
+        revenue, items_sold = revenue[observed], items_sold[observed]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_price = revenue / items_sold
+
+        category_metrics = pd.DataFrame(
+            {'revenue': revenue, 'avg_price': avg_price, 'items_sold': items_sold},
+            index=categories[observed].rename('product_category_name')
+        )
+        for col, name in (('order_id', 'order_count'),
+                          ('product_id', 'unique_products')):
+            value_codes, _ = self._encode(data[col])
+            category_metrics[name] = _nunique_by_group(
+                group_codes, value_codes, n_groups
+            )[observed]
 
         # Calculate additional metrics
         category_metrics['revenue_share'] = (
@@ -229,17 +388,25 @@ class BusinessMetrics:
                 "Geographic information not available in sales data"
             )
 
-        data = self._filter_by_date(self.sales_data, start_date, end_date)
+        data = self._filter_by_date(start_date, end_date)
 
-        state_metrics = data.groupby('customer_state').agg({
-            'price': 'sum',
-            'order_id': 'nunique',
-            'customer_id': 'nunique'
-        }).rename(columns={
-            'price': 'revenue',
-            'order_id': 'order_count',
-            'customer_id': 'unique_customers'
-        })
+        group_codes, states = self._encode(data['customer_state'])
+        n_groups = len(states)
+        observed = self._observed_groups(group_codes, n_groups)
+
+        revenue, _ = _sum_count_by_group(
+            group_codes, data['price'].to_numpy(dtype=float, na_value=np.nan), n_groups
+        )
+        state_metrics = pd.DataFrame(
+            {'revenue': revenue[observed]},
+            index=states[observed].rename('customer_state')
+        )
+        for col, name in (('order_id', 'order_count'),
+                          ('customer_id', 'unique_customers')):
+            value_codes, _ = self._encode(data[col])
+            state_metrics[name] = _nunique_by_group(
+                group_codes, value_codes, n_groups
+            )[observed]
 
         # Calculate additional metrics
         state_metrics['avg_order_value'] = (
@@ -273,21 +440,26 @@ class BusinessMetrics:
                          'Ensure data includes delivered orders.')
             }
 
-        data = self._filter_by_date(self.sales_data, start_date, end_date)
-        data_with_delivery = data.dropna(subset=['delivery_days'])
+        data = self._filter_by_date(start_date, end_date)
+        data_with_delivery = self._filter_by_date(
+            start_date, end_date, required_column='delivery_days'
+        )
 
         if data_with_delivery.empty:
             return {
                 'error': 'No delivery data available for the specified period'
             }
 
-        # Calculate delivery metrics
+        # Calculate delivery metrics on the raw array (no missing values left)
+        delivery_days = data_with_delivery['delivery_days'].to_numpy(dtype=float)
+
         metrics = {
-            'avg_delivery_days': data_with_delivery['delivery_days'].mean(),
-            'median_delivery_days': data_with_delivery['delivery_days'].median(),
-            'min_delivery_days': data_with_delivery['delivery_days'].min(),
-            'max_delivery_days': data_with_delivery['delivery_days'].max(),
-            'std_delivery_days': data_with_delivery['delivery_days'].std(),
+            'avg_delivery_days': delivery_days.mean(),
+            'median_delivery_days': _fast_median(delivery_days),
+            'min_delivery_days': delivery_days.min(),
+            'max_delivery_days': delivery_days.max(),
+            'std_delivery_days': (delivery_days.std(ddof=1)
+                                  if delivery_days.size > 1 else np.nan),
             'total_orders_delivered': len(data_with_delivery['order_id'].unique())
         }
 
@@ -297,14 +469,13 @@ class BusinessMetrics:
 
         # On-time delivery (assuming estimated date exists)
         if 'order_estimated_delivery_date' in data.columns:
-            data_copy = data.copy()
-            data_copy['on_time'] = (
-                data_copy['order_delivered_customer_date'] <=
-                data_copy['order_estimated_delivery_date']
-            )
+            actual = data['order_delivered_customer_date'].to_numpy()
+            estimated = data['order_estimated_delivery_date'].to_numpy()
+
+            # Comparisons with a missing date are False, so those rows count as late
             metrics['on_time_rate'] = (
-                data_copy['on_time'].mean() * 100
-                if not data_copy['on_time'].isna().all() else None
+                (actual <= estimated).mean() * 100
+                if actual.size else None
             )
 
         return metrics
@@ -325,31 +496,45 @@ class BusinessMetrics:
         if 'review_score' not in self.sales_data.columns:
             return {'error': 'Review data not available in sales data'}
 
-        data = self._filter_by_date(self.sales_data, start_date, end_date)
-        data_with_reviews = data.dropna(subset=['review_score'])
+        data_with_reviews = self._filter_by_date(
+            start_date, end_date, required_column='review_score'
+        )
 
         if data_with_reviews.empty:
             return {'error': 'No review data available for the specified period'}
 
         # Get unique orders with reviews
-        order_reviews = data_with_reviews.drop_duplicates(subset=['order_id'])
+        order_reviews = data_with_reviews.iloc[
+            self._first_order_positions(data_with_reviews)
+        ]
+        # Score counts from one pass; the star percentages are derived from them
+        score_counts = np.bincount(
+            order_reviews['review_score'].to_numpy(dtype=np.int64), minlength=6
+        )
+        total_reviews = len(order_reviews)
 
         metrics = {
             'avg_review_score': order_reviews['review_score'].mean(),
             'median_review_score': order_reviews['review_score'].median(),
-            'total_reviews': len(order_reviews),
-            'review_distribution': (
-                order_reviews['review_score'].value_counts().sort_index().to_dict()
-            ),
-            'pct_5_star': (order_reviews['review_score'] == 5).mean() * 100,
-            'pct_4_5_star': (order_reviews['review_score'] >= 4).mean() * 100,
-            'pct_1_2_star': (order_reviews['review_score'] <= 2).mean() * 100
+            'total_reviews': total_reviews,
+            'review_distribution': {
+                score: int(count) for score, count in enumerate(score_counts) if count
+            },
+            'pct_5_star': score_counts[5] / total_reviews * 100,
+            'pct_4_5_star': score_counts[4:].sum() / total_reviews * 100,
+            'pct_1_2_star': score_counts[:3].sum() / total_reviews * 100
         }
 
         # Correlation with delivery time if available
         if 'delivery_days' in data_with_reviews.columns:
-            unique_orders = data_with_reviews.drop_duplicates(subset=['order_id'])
-            correlation = unique_orders[['delivery_days', 'review_score']].corr().iloc[0, 1]
+            delivery = order_reviews['delivery_days'].to_numpy(dtype=float, na_value=np.nan)
+            scores = order_reviews['review_score'].to_numpy(dtype=float, na_value=np.nan)
+            valid = ~(np.isnan(delivery) | np.isnan(scores))
+
+            correlation = np.nan
+            if np.count_nonzero(valid) > 1:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    correlation = np.corrcoef(delivery[valid], scores[valid])[0, 1]
             metrics['delivery_review_correlation'] = correlation
 
         return metrics
@@ -367,95 +552,253 @@ class BusinessMetrics:
         Returns:
             Dictionary with order metrics
         """
-        data = self._filter_by_date(self.sales_data, start_date, end_date)
+        data = self._filter_by_date(start_date, end_date)
 
         # Order-level aggregation
-        order_summary = data.groupby('order_id').agg({
+        order_summary = data.groupby('order_id', sort=False).agg({
             'price': 'sum',
-            'order_item_id': 'count',
-            'product_id': 'nunique'
+            'order_item_id': 'count'
         }).rename(columns={
             'price': 'order_value',
-            'order_item_id': 'items_count',
-            'product_id': 'unique_products'
+            'order_item_id': 'items_count'
         })
 
+        # Unsorted groupby lists orders by first appearance, as factorize does
+        order_codes, orders = self._encode(data['order_id'])
+        product_codes, _ = self._encode(data['product_id'])
+        order_summary['unique_products'] = _nunique_by_group(
+            order_codes, product_codes, len(orders)
+        )
+
+        # Summary statistics computed in one aggregation call per column
+        value_stats = order_summary['order_value'].agg(
+            ['sum', 'mean', 'std', 'min', 'max']
+        )
+        per_order_means = order_summary[['items_count', 'unique_products']].mean()
+
         metrics = {
             'total_orders': len(order_summary),
-            'total_revenue': order_summary['order_value'].sum(),
-            'avg_order_value': order_summary['order_value'].mean(),
-            'median_order_value': order_summary['order_value'].median(),
-            'avg_items_per_order': order_summary['items_count'].mean(),
-            'avg_unique_products_per_order': order_summary['unique_products'].mean(),
-            'order_value_std': order_summary['order_value'].std(),
-            'min_order_value': order_summary['order_value'].min(),
-            'max_order_value': order_summary['order_value'].max()
+            'total_revenue': value_stats['sum'],
+            'avg_order_value': value_stats['mean'],
+            'median_order_value': _fast_median(
+                order_summary['order_value'].to_numpy(dtype=float)
+            ),
+            'avg_items_per_order': per_order_means['items_count'],
+            'avg_unique_products_per_order': per_order_means['unique_products'],
+            'order_value_std': value_stats['std'],
+            'min_order_value': value_stats['min'],
+            'max_order_value': value_stats['max']
         }
 
         # Order status distribution if available
         if 'order_status' in data.columns:
-            status_dist = data.drop_duplicates(subset=['order_id'])['order_status'].value_counts()
+            statuses = data['order_status'].cat
+            status_codes = statuses.codes.to_numpy()[self._first_order_positions(data)]
+            status_dist = pd.Series(
+                np.bincount(status_codes[status_codes >= 0],
+                            minlength=len(statuses.categories)),
+                index=statuses.categories.rename('order_status')
+            )
+            status_dist = status_dist[status_dist > 0].sort_values(
+                ascending=False, kind='stable'
+            )
             metrics['order_status_distribution'] = status_dist.to_dict()
             metrics['order_status_percentages'] = (status_dist / status_dist.sum() * 100).to_dict()
 
         return metrics
 
+    def _rows_for_year(self, year: int) -> pd.DataFrame:
+        """
+        Get the sales rows for a single year.
+
+        Args:
+            year: Year to select
+
+        Returns:
+            DataFrame with the rows purchased in that year
+        """
+        positions = self._year_groups.get(year, np.empty(0, dtype=np.intp))
+        return self.sales_data.take(positions)
+
+    def _get_order_totals(self) -> pd.DataFrame:
+        """
+        Get the total price and purchase year of every order.
+
+        Returns:
+            DataFrame indexed by order_id with order_price and year columns
+        """
+        if self._order_totals is None:
+            self._order_totals = self.sales_data.groupby('order_id', sort=False).agg(
+                order_price=('price', 'sum'),
+                year=('year', 'first')
+            )
+
+        return self._order_totals
+
+    def _first_order_positions(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Locate the first row of each order in a view of the sales data.
+
+        Args:
+            data: DataFrame derived from self.sales_data by row selection
+
+        Returns:
+            Sorted positional indices of each order's first row
+        """
+        codes = self._order_id_codes[data.index.to_numpy()]
+        _, first_positions = np.unique(codes, return_index=True)
+        return np.sort(first_positions)
+
+    @staticmethod
+    def _encode(column: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+        """
+        Encode a column as integer codes.
+
+        Args:
+            column: Categorical or key column
+
+        Returns:
+            Tuple of (codes with -1 for missing values, label for each code)
+        """
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column.cat.codes.to_numpy(), column.cat.categories
+
+        codes, uniques = pd.factorize(column)
+        return codes, pd.Index(uniques)
+
+    @staticmethod
+    def _observed_groups(group_codes: np.ndarray, n_groups: int) -> np.ndarray:
+        """
+        Find the group codes that occur at least once.
+
+        Args:
+            group_codes: Group code for each row (negative for missing)
+            n_groups: Number of groups
+
+        Returns:
+            Sorted array of observed group codes
+        """
+        return np.flatnonzero(np.bincount(group_codes[group_codes >= 0], minlength=n_groups))
+
+    @staticmethod
+    def _optimize_dtypes(data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Store columns in the narrowest dtype that holds their values.
+
+        Args:
+            data: DataFrame containing merged sales data
+
+        Returns:
+            Copy of the DataFrame with Arrow-backed id columns, categorical
+            labels and downcast integer columns (price stays float64 so
+            revenue totals keep cent precision)
+        """
+        # Keys arrive as plain or categorical strings; both become Arrow strings
+        conversions = {
+            col: pd.StringDtype('pyarrow') for col in ARROW_KEY_COLUMNS
+            if col in data.columns and not isinstance(data[col].dtype, pd.StringDtype)
+        }
+        conversions.update({
+            col: 'category' for col in CATEGORY_COLUMNS if col in data.columns
+        })
+        conversions.update({
+            col: dtype for col, dtype in NULLABLE_INT_COLUMNS.items()
+            if col in data.columns
+        })
+
+        optimized = data.astype(conversions)
+
+        for col in ('year', 'month'):
+            if col in optimized.columns:
+                optimized[col] = pd.to_numeric(optimized[col], downcast='integer')
+
+        return optimized
+
     def _filter_by_date(self,
-                       data: pd.DataFrame,
-                       start_date: Optional[str],
-                       end_date: Optional[str]) -> pd.DataFrame:
+                        start_date: Optional[str],
+                        end_date: Optional[str],
+                        required_column: Optional[str] = None) -> pd.DataFrame:
         """
-        Filter DataFrame by date range.
+        Filter the sales data by date range.
 
         Args:
-            data: DataFrame to filter
             start_date: Start date for filtering
             end_date: End date for filtering
+            required_column: Column whose missing values are dropped in the
+                same pass as the date filter
 
         Returns:
-            Filtered DataFrame
+            Filtered DataFrame (a view of the sales data when no rows are
+            dropped, so callers must not modify the result in place)
+        """
+        if not start_date and not end_date and required_column is None:
+            return self.sales_data
+
+        return self.sales_data.iloc[
+            self._filter_indices(start_date, end_date, required_column)
+        ]
+
+    def _compute_filter_indices(self,
+                                start_date: Optional[str],
+                                end_date: Optional[str],
+                                required_column: Optional[str]) -> Union[slice, np.ndarray]:
         """
-        filtered_data = data.copy()
+        Locate the sales data rows in a date range.
+
+        Called through the per-instance LRU cache in self._filter_indices.
 
-        if start_date:
-            start_dt = pd.to_datetime(start_date)
-            filtered_data = filtered_data[
-                filtered_data['order_purchase_timestamp'] >= start_dt
-            ]
+        Args:
+            start_date: Start date for filtering
+            end_date: End date for filtering
+            required_column: Column whose missing values are dropped
 
+        Returns:
+            Slice of the rows in range, or read-only array of row positions
+            when required_column drops some of them
+        """
+        lo = (np.searchsorted(self._ts_index,
+                              pd.Timestamp(start_date).to_datetime64(),
+                              side='left')
+              if start_date else 0)
         if end_date:
-            end_dt = pd.to_datetime(end_date)
-            filtered_data = filtered_data[
-                filtered_data['order_purchase_timestamp'] <= end_dt
-            ]
+            hi = np.searchsorted(self._ts_index,
+                                 pd.Timestamp(end_date).to_datetime64(),
+                                 side='right')
+        else:
+            # No range at all keeps undated rows; a start date alone drops them
+            hi = self._ts_end if start_date else len(self.sales_data)
 
-        return filtered_data
+        if required_column is None:
+            return slice(lo, hi)
+
+        positions = lo + np.flatnonzero(
+            self.sales_data[required_column].iloc[lo:hi].notna().to_numpy()
+        )
+        positions.flags.writeable = False
+        return positions
 
     def _categorize_delivery_speed(self, data: pd.DataFrame) -> Dict:
         """
         Categorize delivery times into speed categories.
 
         Args:
-            data: DataFrame with delivery_days column
+            data: View of the sales data with non-missing delivery_days
 
         Returns:
             Dictionary with delivery speed distribution
         """
-        conditions = [
-            (data['delivery_days'] <= 3),
-            (data['delivery_days'] <= 7),
-            (data['delivery_days'] <= 14),
-            (data['delivery_days'] > 14)
-        ]
-
+        # Upper bounds (inclusive) of the first three speed categories
+        bins = np.array([3, 7, 14])
         categories = ['1-3 days', '4-7 days', '8-14 days', '15+ days']
 
-        data_copy = data.copy()
-        data_copy['delivery_category'] = np.select(conditions, categories, default='Unknown')
+        # Bin only the first row of each order
+        first_rows = self._first_order_positions(data)
+        days = data['delivery_days'].to_numpy(dtype=float, na_value=np.nan)[first_rows]
+        codes = np.digitize(days, bins, right=True)
 
-        # Get unique orders for distribution
-        unique_orders = data_copy.drop_duplicates(subset=['order_id'])
-        distribution = unique_orders['delivery_category'].value_counts()
+        distribution = pd.Series(np.bincount(codes, minlength=len(categories)),
+                                 index=categories)
+        distribution = distribution[distribution > 0]
 
         return {
             'counts': distribution.to_dict(),
@@ -3,10 +3,14 @@ E-commerce Dashboard
 A professional Streamlit dashboard for e-commerce data analysis
 """
 
+import hashlib
+import inspect
+import os
 import warnings
 from datetime import datetime, timedelta
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -81,33 +85,115 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
+DATA_PATH = 'ecommerce_data'
+
+# Modules whose code shapes the cached frames and cube
+CACHE_SOURCES = (__file__, inspect.getsourcefile(DataLoader))
+
+def get_code_version(sources=CACHE_SOURCES):
+    """Hash the source of the modules that build the cached data"""
+    digest = hashlib.sha256()
+    for path in sources:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def get_data_version(data_path=DATA_PATH):
+    """Get the CSV modification times and loader code hash, used as the load_data cache key"""
+    csv_mtimes = tuple(sorted(
+        (name, os.path.getmtime(os.path.join(data_path, name)))
+        for name in os.listdir(data_path) if name.endswith('.csv')
+    ))
+    return csv_mtimes, get_code_version()
+
+# Parallel test servers set DASHBOARD_PERSIST_CACHE=0: on a cold or stale
+# cache they would all write the same pickle at once, and the writes are not
+# atomic, so one server could read another's half-written file
+PERSIST_CACHE = 'disk' if os.environ.get('DASHBOARD_PERSIST_CACHE', '1') != '0' else None
+
+@st.cache_data(persist=PERSIST_CACHE)
+def load_data(data_version):
     """Load and prepare data for the dashboard"""
-    loader = DataLoader('ecommerce_data')
+    # data_version is only part of the cache key: the result is pickled under
+    # the user's Streamlit cache directory (~/.streamlit/cache), survives
+    # restarts and is rebuilt once any CSV or the loading code in
+    # dashboard.py / data_loader.py changes
+    loader = DataLoader(DATA_PATH)
     datasets = loader.load_all_datasets()
 
-    # Create comprehensive dataset
+    # Create comprehensive dataset: one frame carrying the product category
+    # and customer state columns next to the sales rows
     sales_data = loader.create_sales_data(status_filter='delivered')
-    sales_with_products = loader.create_sales_with_products()
-    sales_with_geography = loader.create_sales_with_geography()
-
-    # Merge with reviews
-    sales_with_reviews = pd.merge(
-        sales_data,
-        datasets['reviews'][['order_id', 'review_score']].drop_duplicates(subset=['order_id']),
-        on='order_id',
-        how='left'
+    sales_with_products = loader.create_sales_with_products(sales_data=sales_data)
+    sales_with_geography = loader.create_sales_with_geography(sales_data=sales_with_products)
+
+    # Join reviews (one score per order) against the order_id column
+    sales_with_reviews = sales_with_geography.join(
+        loader.get_order_reviews(), on='order_id', how='left'
     )
 
     return {
         'sales_data': sales_data,
-        'sales_with_products': sales_with_products,
-        'sales_with_geography': sales_with_geography,
         'sales_with_reviews': sales_with_reviews,
+        'cube': build_sales_cube(sales_with_reviews),
         'datasets': datasets
     }
 
+def purchase_day(data):
+    """Get the purchase date (midnight) of each row as the 'day' key"""
+    return data['order_purchase_timestamp'].dt.floor('D').rename('day')
+
+def build_sales_cube(sales):
+    """Pre-aggregate sales by purchase day so date filters scan days, not rows"""
+    # Purchase day of every row, computed once and shared by all tables
+    day = purchase_day(sales)
+
+    daily_aggs = {'revenue': ('price', 'sum')}
+    for column, name in (('delivery_days', 'delivery'), ('review_score', 'review')):
+        if column in sales.columns:
+            daily_aggs[f'{name}_sum'] = (column, 'sum')
+            daily_aggs[f'{name}_count'] = (column, 'count')
+
+    daily = sales.groupby(day).agg(**daily_aggs)
+
+    # Each order has a single purchase day, so summing a first-item flag
+    # per day counts distinct orders (and the counts add up over any range)
+    first_item = ~sales['order_id'].duplicated()
+    daily.insert(1, 'orders', first_item.groupby(day).sum())
+
+    cube = {'daily': daily.reset_index()}
+
+    for column, table in (('product_category_name', 'by_category'),
+                          ('customer_state', 'by_state')):
+        if column in sales.columns:
+            cube[table] = sales.groupby(
+                [day, column], observed=True
+            )['price'].sum().rename('revenue').reset_index()
+
+    if {'delivery_days', 'review_score'}.issubset(sales.columns):
+        rated = sales.dropna(subset=['delivery_days', 'review_score'])
+
+        # Define delivery time buckets: right-closed bins (0, 3], (3, 7], ...
+        # located by binary search; days <= 0 get code -1 (no bucket)
+        edges = np.array([0, 3, 7, 14, 30, np.inf])
+        codes = np.searchsorted(
+            edges, rated['delivery_days'].to_numpy(dtype=float), side='left'
+        ) - 1
+        delivery_bucket = pd.Series(
+            pd.Categorical.from_codes(
+                codes,
+                categories=['1-3 days', '4-7 days', '8-14 days', '15-30 days', '30+ days']
+            ),
+            index=rated.index,
+            name='delivery_bucket'
+        )
+
+        cube['by_delivery_bucket'] = rated.groupby(
+            [day.loc[rated.index], delivery_bucket], observed=True
+        )['review_score'].agg(review_sum='sum', review_count='count').reset_index()
+
+    return cube
+
 def format_currency(value):
     """Format currency values with K/M suffixes"""
     if value >= 1_000_000:
@@ -128,28 +214,99 @@ def get_trend_color(value):
     """Get color class for trend indicators"""
     return "trend-positive" if value > 0 else "trend-negative"
 
-def filter_data_by_date(data, start_date, end_date):
-    """Filter data by date range"""
-    return data[
-        (data['order_purchase_timestamp'] >= start_date) &
-        (data['order_purchase_timestamp'] <= end_date)
-    ]
-
-def calculate_period_comparison(current_data, previous_data, metric_column):
-    """Calculate percentage change between periods"""
-    if metric_column == 'revenue':
-        current_value = current_data['price'].sum()
-        previous_value = previous_data['price'].sum()
-    elif metric_column == 'orders':
-        current_value = current_data['order_id'].nunique()
-        previous_value = previous_data['order_id'].nunique()
-    elif metric_column == 'aov':
-        current_value = current_data.groupby('order_id')['price'].sum().mean()
-        previous_value = previous_data.groupby('order_id')['price'].sum().mean()
+def filter_cube_by_date(table, start_date, end_date):
+    """Filter cube rows to purchases between two midnight bounds"""
+    # Cube tables come out of sorted groupbys, so 'day' is ascending and the
+    # range is a slice located by binary search
+    days = table['day'].to_numpy()
+
+    # Bounds are midnights, so purchases made on the end date itself lie
+    # after end_date, as with a row-level '<= end_date' filter
+    lo = np.searchsorted(days, pd.Timestamp(start_date).to_datetime64(), side='left')
+    hi = np.searchsorted(days, pd.Timestamp(end_date).to_datetime64(), side='left')
+
+    return table.iloc[lo:hi]
+
+def summarize_period(daily):
+    """Calculate revenue, order count and AOV from filtered daily totals"""
+    revenue = daily['revenue'].sum()
+    orders = daily['orders'].sum()
+
+    return {
+        'revenue': revenue,
+        'orders': orders,
+        'aov': revenue / orders if orders else float('nan')
+    }
+
+def monthly_revenue(daily):
+    """Sum filtered daily revenue by calendar month ('period' is the month start)"""
+    # Floor days to months with a numpy unit cast instead of Period objects
+    months = daily['day'].to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
+    return daily.groupby(months)['revenue'].sum().rename_axis('period').reset_index()
+
+def period_mean(daily, name):
+    """Calculate a per-row mean from filtered daily '<name>_sum'/'<name>_count' totals"""
+    count = daily[f'{name}_count'].sum()
+    return daily[f'{name}_sum'].sum() / count if count else float('nan')
+
+@st.cache_data(max_entries=64)
+def period_breakdowns(data_version, start_date, end_date, _cube):
+    """Aggregate the chart tables for one date range, cached per range"""
+    # Revisiting a range (as date filters often do) skips the groupbys below.
+    # The leading underscore keeps the cube out of the cache key, which
+    # data_version already covers, so it is neither hashed nor reloaded
+    cube = _cube
+    daily = filter_cube_by_date(cube['daily'], start_date, end_date)
+    breakdowns = {'monthly': monthly_revenue(daily)}
+
+    # Product category totals; select the top 10 without sorting every
+    # category, then order ascending so the largest bar is drawn at the top
+    current_products = (
+        filter_cube_by_date(cube['by_category'], start_date, end_date)
+        if 'by_category' in cube else pd.DataFrame()
+    )
+    breakdowns['categories'] = (
+        current_products.groupby(
+            'product_category_name', observed=True
+        )['revenue'].sum().nlargest(10).reset_index().sort_values('revenue')
+        if not current_products.empty else None
+    )
+
+    # State totals
+    current_geography = (
+        filter_cube_by_date(cube['by_state'], start_date, end_date)
+        if 'by_state' in cube else pd.DataFrame()
+    )
+    breakdowns['states'] = (
+        current_geography.groupby(
+            'customer_state', observed=True
+        )['revenue'].sum().reset_index()
+        if not current_geography.empty else None
+    )
+
+    # Average review score by delivery bucket
+    breakdowns['satisfaction'] = None
+    if not daily.empty and 'by_delivery_bucket' in cube:
+        delivery_data = filter_cube_by_date(
+            cube['by_delivery_bucket'], start_date, end_date
+        )
+        bucket_totals = delivery_data.groupby(
+            'delivery_bucket', observed=False
+        )[['review_sum', 'review_count']].sum()
+        breakdowns['satisfaction'] = (
+            bucket_totals['review_sum'] / bucket_totals['review_count']
+        ).rename('review_score').reset_index()
+
+    return breakdowns
 
+def calculate_period_comparison(current_summary, previous_summary, metric_column):
+    """Calculate percentage change between two period summaries"""
     if metric_column not in ['revenue', 'orders', 'aov']:
         return 0
 
+    current_value = current_summary[metric_column]
+    previous_value = previous_summary[metric_column]
+
     if previous_value == 0:
         return 0
 
@@ -157,33 +314,41 @@ def calculate_period_comparison(current_data, previous_data, metric_column):
 
 def main():
     # Load data
-    data = load_data()
+    data_version = get_data_version()
+    data = load_data(data_version)
 
     # Header section
     st.markdown("## E-commerce Analytics Dashboard")
 
     # Date range filter in header
-    _, col2, col3 = st.columns([2, 1, 1])
-
-    with col2:
-        # Get available date range
-        min_date = data['sales_data']['order_purchase_timestamp'].min().date()
-        max_date = data['sales_data']['order_purchase_timestamp'].max().date()
-
-        start_date = st.date_input(
-            "Start Date",
-            value=datetime(2023, 1, 1).date(),
-            min_value=min_date,
-            max_value=max_date
-        )
+    _, filter_col = st.columns([2, 2])
+
+    # Get available date range
+    min_date = data['sales_data']['order_purchase_timestamp'].min().date()
+    max_date = data['sales_data']['order_purchase_timestamp'].max().date()
+
+    # A form applies both dates in a single rerun; every panel below reads
+    # this range, so panels rerun with the script rather than as fragments
+    with filter_col, st.form("filters", border=False, enter_to_submit=False):
+        col2, col3 = st.columns(2)
+
+        with col2:
+            start_date = st.date_input(
+                "Start Date",
+                value=datetime(2023, 1, 1).date(),
+                min_value=min_date,
+                max_value=max_date
+            )
 
-    with col3:
-        end_date = st.date_input(
-            "End Date",
-            value=datetime(2023, 12, 31).date(),
-            min_value=min_date,
-            max_value=max_date
-        )
+        with col3:
+            end_date = st.date_input(
+                "End Date",
+                value=datetime(2023, 12, 31).date(),
+                min_value=min_date,
+                max_value=max_date
+            )
+
+        st.form_submit_button("Apply")
 
     # Convert to datetime for filtering
     start_datetime = pd.to_datetime(start_date)
@@ -194,13 +359,17 @@ def main():
     previous_start = start_datetime - timedelta(days=period_length)
     previous_end = start_datetime - timedelta(days=1)
 
-    # Filter data for current and previous periods
-    current_data = filter_data_by_date(
-        data['sales_with_reviews'], start_datetime, end_datetime
-    )
-    previous_data = filter_data_by_date(
-        data['sales_with_reviews'], previous_start, previous_end
-    )
+    # Filter the pre-aggregated daily totals for current and previous periods
+    cube = data['cube']
+    current_daily = filter_cube_by_date(cube['daily'], start_datetime, end_datetime)
+    previous_daily = filter_cube_by_date(cube['daily'], previous_start, previous_end)
+
+    # Chart tables for the current period, cached per date range
+    breakdowns = period_breakdowns(data_version, start_datetime, end_datetime, cube)
+
+    # KPI values for both periods, shared by all cards
+    current_summary = summarize_period(current_daily)
+    previous_summary = summarize_period(previous_daily)
 
     # KPI Row - 4 cards
     st.markdown("### Key Performance Indicators")
@@ -209,11 +378,11 @@ def main():
 
     # Total Revenue
     with kpi_col1:
-        total_revenue = current_data['price'].sum()
-        revenue_trend = calculate_period_comparison(current_data, previous_data, 'revenue')
+        total_revenue = current_summary['revenue']
+        revenue_trend = calculate_period_comparison(current_summary, previous_summary, 'revenue')
 
         st.markdown(f"""
-        <div class="metric-card">
+        <div class="metric-card" data-testid="kpi-total-revenue">
             <h4>Total Revenue</h4>
             <div class="big-font">{format_currency(total_revenue)}</div>
             <div class="{get_trend_color(revenue_trend)}">{format_percentage(revenue_trend)}</div>
@@ -223,7 +392,7 @@ def main():
     # Period Growth
     with kpi_col2:
         st.markdown(f"""
-        <div class="metric-card">
+        <div class="metric-card" data-testid="kpi-period-growth">
             <h4>Period Growth</h4>
             <div class="big-font">{revenue_trend:.1f}%</div>
             <div class="{get_trend_color(revenue_trend)}">{format_percentage(revenue_trend)}</div>
@@ -232,11 +401,11 @@ def main():
 
     # Average Order Value
     with kpi_col3:
-        avg_order_value = current_data.groupby('order_id')['price'].sum().mean()
-        aov_trend = calculate_period_comparison(current_data, previous_data, 'aov')
+        avg_order_value = current_summary['aov']
+        aov_trend = calculate_period_comparison(current_summary, previous_summary, 'aov')
 
         st.markdown(f"""
-        <div class="metric-card">
+        <div class="metric-card" data-testid="kpi-average-order-value">
             <h4>Average Order Value</h4>
             <div class="big-font">${avg_order_value:.0f}</div>
             <div class="{get_trend_color(aov_trend)}">{format_percentage(aov_trend)}</div>
@@ -245,11 +414,11 @@ def main():
 
     # Total Orders
     with kpi_col4:
-        total_orders = current_data['order_id'].nunique()
-        orders_trend = calculate_period_comparison(current_data, previous_data, 'orders')
+        total_orders = current_summary['orders']
+        orders_trend = calculate_period_comparison(current_summary, previous_summary, 'orders')
 
         st.markdown(f"""
-        <div class="metric-card">
+        <div class="metric-card" data-testid="kpi-total-orders">
             <h4>Total Orders</h4>
             <div class="big-font">{total_orders:,}</div>
             <div class="{get_trend_color(orders_trend)}">{format_percentage(orders_trend)}</div>
@@ -268,15 +437,8 @@ def main():
         st.markdown("#### Revenue Trend")
 
         # Prepare revenue trend data
-        current_monthly = current_data.groupby(
-            current_data['order_purchase_timestamp'].dt.to_period('M')
-        )['price'].sum().reset_index()
-        current_monthly['period'] = current_monthly['order_purchase_timestamp'].dt.to_timestamp()
-
-        previous_monthly = previous_data.groupby(
-            previous_data['order_purchase_timestamp'].dt.to_period('M')
-        )['price'].sum().reset_index()
-        previous_monthly['period'] = previous_monthly['order_purchase_timestamp'].dt.to_timestamp()
+        current_monthly = breakdowns['monthly']
+        previous_monthly = monthly_revenue(previous_daily)
 
         # Create revenue trend chart
         fig_revenue = go.Figure()
@@ -284,7 +446,7 @@ def main():
         if not current_monthly.empty:
             fig_revenue.add_trace(go.Scatter(
                 x=current_monthly['period'],
-                y=current_monthly['price'],
+                y=current_monthly['revenue'],
                 mode='lines+markers',
                 name='Current Period',
                 line={'color': '#1f77b4', 'width': 3},
@@ -294,7 +456,7 @@ def main():
         if not previous_monthly.empty:
             fig_revenue.add_trace(go.Scatter(
                 x=previous_monthly['period'],
-                y=previous_monthly['price'],
+                y=previous_monthly['revenue'],
                 mode='lines+markers',
                 name='Previous Period',
                 line={'color': '#ff7f0e', 'width': 2, 'dash': 'dash'},
@@ -317,28 +479,17 @@ def main():
     with chart_col2:
         st.markdown("#### Top 10 Product Categories")
 
-        # Filter product data for current period
-        current_products = filter_data_by_date(
-            data['sales_with_products'], start_datetime, end_datetime
-        )
-
-        if (not current_products.empty and
-            'product_category_name' in current_products.columns):
-            category_revenue = current_products.groupby(
-                'product_category_name'
-            )['price'].sum().reset_index()
-            category_revenue = category_revenue.sort_values(
-                'price', ascending=True
-            ).tail(10)
+        category_revenue = breakdowns['categories']
 
+        if category_revenue is not None:
             fig_categories = px.bar(
                 category_revenue,
-                x='price',
+                x='revenue',
                 y='product_category_name',
                 orientation='h',
-                color='price',
+                color='revenue',
                 color_continuous_scale='Blues',
-                labels={'price': 'Revenue', 'product_category_name': 'Category'}
+                labels={'revenue': 'Revenue', 'product_category_name': 'Category'}
             )
 
             fig_categories.update_layout(
@@ -348,6 +499,8 @@ def main():
                 coloraxis_showscale=False,
                 xaxis={'tickformat': '$,.0s'}
             )
+            # Format revenue in the browser rather than per value in Python
+            fig_categories.update_traces(hovertemplate='%{y}: %{x:$,.3s}<extra></extra>')
 
             st.plotly_chart(fig_categories, use_container_width=True)
         else:
@@ -360,18 +513,9 @@ def main():
     with chart_col3:
         st.markdown("#### Revenue by State")
 
-        # Filter geographic data for current period
-        current_geography = filter_data_by_date(
-            data['sales_with_geography'], start_datetime, end_datetime
-        )
-
-        if (not current_geography.empty and
-            'customer_state' in current_geography.columns):
-            state_revenue = current_geography.groupby(
-                'customer_state'
-            )['price'].sum().reset_index()
-            state_revenue.columns = ['customer_state', 'revenue']
+        state_revenue = breakdowns['states']
 
+        if state_revenue is not None:
             fig_map = px.choropleth(
                 state_revenue,
                 locations='customer_state',
@@ -385,8 +529,10 @@ def main():
             fig_map.update_layout(
                 height=350,
                 margin={'l': 0, 'r': 0, 't': 30, 'b': 0},
-                geo={'showframe': False, 'showcoastlines': True}
+                geo={'showframe': False, 'showcoastlines': True},
+                coloraxis_colorbar={'tickformat': '$,.2s'}
             )
+            fig_map.update_traces(hovertemplate='%{location}: %{z:$,.3s}<extra></extra>')
 
             st.plotly_chart(fig_map, use_container_width=True)
         else:
@@ -396,24 +542,9 @@ def main():
     with chart_col4:
         st.markdown("#### Satisfaction vs Delivery Time")
 
-        if (not current_data.empty and
-            'delivery_days' in current_data.columns and
-            'review_score' in current_data.columns):
-            # Create delivery time buckets
-            delivery_data = current_data.dropna(subset=['delivery_days', 'review_score']).copy()
-
-            # Define delivery time buckets
-            delivery_data['delivery_bucket'] = pd.cut(
-                delivery_data['delivery_days'],
-                bins=[0, 3, 7, 14, 30, float('inf')],
-                labels=['1-3 days', '4-7 days', '8-14 days', '15-30 days', '30+ days']
-            )
-
-            # Calculate average review score by delivery bucket
-            delivery_satisfaction = delivery_data.groupby(
-                'delivery_bucket'
-            )['review_score'].mean().reset_index()
+        delivery_satisfaction = breakdowns['satisfaction']
 
+        if delivery_satisfaction is not None:
             fig_satisfaction = px.bar(
                 delivery_satisfaction,
                 x='delivery_bucket',
@@ -444,15 +575,15 @@ def main():
 
     # Average Delivery Time
     with bottom_col1:
-        if 'delivery_days' in current_data.columns:
-            avg_delivery = current_data['delivery_days'].mean()
-            prev_avg_delivery = (previous_data['delivery_days'].mean()
-                               if not previous_data.empty else avg_delivery)
+        if 'delivery_sum' in current_daily.columns:
+            avg_delivery = period_mean(current_daily, 'delivery')
+            prev_avg_delivery = (period_mean(previous_daily, 'delivery')
+                               if not previous_daily.empty else avg_delivery)
             delivery_trend = (((avg_delivery - prev_avg_delivery) / prev_avg_delivery * 100)
                             if prev_avg_delivery != 0 else 0)
 
             st.markdown(f"""
-            <div class="bottom-card">
+            <div class="bottom-card" data-testid="delivery-time-card">
                 <h4>Average Delivery Time</h4>
                 <div class="big-font">{avg_delivery:.1f} days</div>
                 <div class="{get_trend_color(-delivery_trend)}">{format_percentage(delivery_trend)}</div>
@@ -460,7 +591,7 @@ def main():
             """, unsafe_allow_html=True)
         else:
             st.markdown("""
-            <div class="bottom-card">
+            <div class="bottom-card" data-testid="delivery-time-card">
                 <h4>Average Delivery Time</h4>
                 <div>Data not available</div>
             </div>
@@ -468,17 +599,17 @@ def main():
 
     # Review Score
     with bottom_col2:
-        if 'review_score' in current_data.columns:
-            avg_review = current_data['review_score'].mean()
-            prev_avg_review = (previous_data['review_score'].mean()
-                             if not previous_data.empty else avg_review)
+        if 'review_sum' in current_daily.columns:
+            avg_review = period_mean(current_daily, 'review')
+            prev_avg_review = (period_mean(previous_daily, 'review')
+                             if not previous_daily.empty else avg_review)
             review_trend = (((avg_review - prev_avg_review) / prev_avg_review * 100)
                           if prev_avg_review != 0 else 0)
 
             star_rating = "⭐" * int(round(avg_review))
 
             st.markdown(f"""
-            <div class="bottom-card">
+            <div class="bottom-card" data-testid="review-score-card">
                 <h4>Average Review Score</h4>
                 <div class="big-font">{avg_review:.2f} {star_rating}</div>
                 <div class="{get_trend_color(review_trend)}">{format_percentage(review_trend)}</div>
@@ -486,7 +617,7 @@ def main():
             """, unsafe_allow_html=True)
         else:
             st.markdown("""
-            <div class="bottom-card">
+            <div class="bottom-card" data-testid="review-score-card">
                 <h4>Average Review Score</h4>
                 <div>Data not available</div>
             </div>
@@ -5,12 +5,25 @@ This module handles all data loading, cleaning, and preprocessing operations
 for the e-commerce datasets.
 """
 
-from typing import Optional, Dict
+from typing import Optional, Dict, Sequence
+import os
 import warnings
 import pandas as pd
 
 warnings.filterwarnings('ignore', category=pd.errors.SettingWithCopyWarning)
 
+# CSVs larger than this are parsed in chunks of CHUNK_ROWS rows, so raw
+# timestamp strings never exist for the whole file at once
+CHUNKED_READ_BYTES = 256 * 1024 ** 2
+CHUNK_ROWS = 500_000
+
+# Key columns shared between datasets, encoded as categoricals over one
+# common set of categories so joins and distinct counts work on codes
+KEY_COLUMNS = {
+    'order_id': ('orders', 'order_items', 'reviews', 'payments'),
+    'customer_id': ('orders', 'customers')
+}
+
 
 class DataLoader:
     """Handles loading and processing of e-commerce datasets."""
@@ -25,16 +38,128 @@ class DataLoader:
         self.data_path = data_path
         self._datasets = {}
 
+        # Merged sales data keyed by (start_date, end_date, status_filter)
+        self._sales_data = {}
+
+        # One review score per order, built on first use
+        self._order_reviews: Optional[pd.DataFrame] = None
+
+    def _cached_path(self, name: str) -> Optional[str]:
+        """
+        Get the Parquet cache file for a dataset if it is up to date.
+
+        Args:
+            name: Dataset file name without extension (e.g. 'orders_dataset')
+
+        Returns:
+            Path to the Parquet file, or None if it is missing or older
+            than the CSV it was built from
+        """
+        parquet_path = f'{self.data_path}/{name}.parquet'
+        csv_path = f'{self.data_path}/{name}.csv'
+
+        if not os.path.exists(parquet_path):
+            return None
+        if os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(parquet_path):
+            return None
+        return parquet_path
+
+    def _read_dataset(self,
+                      name: str,
+                      date_columns: Sequence[str] = ()) -> pd.DataFrame:
+        """
+        Read a dataset, preferring its Parquet cache over the CSV.
+
+        The CSV is parsed only when no current cache exists. The parsed
+        table (with date columns converted) is then written to Parquet so
+        later loads skip CSV parsing altogether.
+
+        Args:
+            name: Dataset file name without extension (e.g. 'orders_dataset')
+            date_columns: Columns to convert to datetime when parsing the CSV
+
+        Returns:
+            DataFrame with the dataset
+        """
+        cached = self._cached_path(name)
+        if cached is not None:
+            return self._arrow_strings(pd.read_parquet(cached))
+
+        csv_path = f'{self.data_path}/{name}.csv'
+        if os.path.getsize(csv_path) > CHUNKED_READ_BYTES:
+            df = self._load_chunked(csv_path, date_columns)
+        else:
+            # The pyarrow parser converts ISO timestamps to datetime while reading
+            df = pd.read_csv(csv_path, engine='pyarrow')
+
+        # Only columns left as text (malformed values) are coerced here
+        for col in date_columns:
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], format='ISO8601', errors='coerce')
+
+        df = self._arrow_strings(df)
+
+        try:
+            df.to_parquet(f'{self.data_path}/{name}.parquet',
+                          compression='zstd', index=False)
+        except OSError as e:
+            # A read-only data directory only costs the cache, not the load
+            warnings.warn(f"Could not write Parquet cache for {name}: {e}")
+
+        return df
+
+    @staticmethod
+    def _arrow_strings(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Store text columns as Arrow-backed strings.
+
+        Text lives in contiguous Arrow buffers instead of Python objects;
+        numeric and datetime columns stay NumPy-backed.
+
+        Args:
+            df: DataFrame read from CSV or Parquet
+
+        Returns:
+            DataFrame with object and Python string columns as string[pyarrow]
+        """
+        text_columns = [
+            col for col in df.columns
+            if df[col].dtype == object or
+            (isinstance(df[col].dtype, pd.StringDtype) and df[col].dtype.storage != 'pyarrow')
+        ]
+        return df.astype({col: pd.StringDtype('pyarrow') for col in text_columns})
+
+    @staticmethod
+    def _load_chunked(path: str,
+                      date_columns: Sequence[str] = (),
+                      chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+        """
+        Read a large CSV in chunks, converting date columns chunk by chunk.
+
+        Args:
+            path: Path to the CSV file
+            date_columns: Columns to convert to datetime in each chunk
+            chunksize: Number of rows per chunk
+
+        Returns:
+            DataFrame with the whole file, concatenated once at the end
+        """
+        parts = []
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            for col in date_columns:
+                chunk[col] = pd.to_datetime(chunk[col], format='ISO8601', errors='coerce')
+            parts.append(chunk)
+
+        return pd.concat(parts, ignore_index=True)
+
     def load_orders(self) -> pd.DataFrame:
         """
         Load and process orders dataset.
 
         Returns:
-            DataFrame with processed order data
+            DataFrame with processed order data, indexed by order_id
         """
-        orders = pd.read_csv(f'{self.data_path}/orders_dataset.csv')
-
-        # Convert timestamp columns to datetime
+        # Timestamp columns are parsed as datetime when reading the CSV
         date_columns = [
             'order_purchase_timestamp',
             'order_approved_at',
@@ -42,15 +167,22 @@ class DataLoader:
             'order_delivered_customer_date',
             'order_estimated_delivery_date'
         ]
+        orders = self._read_dataset('orders_dataset', date_columns)
 
-        for col in date_columns:
-            orders[col] = pd.to_datetime(orders[col], errors='coerce')
+        # Add year and month columns for easier filtering, stored in the
+        # narrowest integer dtype that holds them (int16 / int8)
+        purchase_dates = orders['order_purchase_timestamp'].dt
+        orders['year'] = pd.to_numeric(purchase_dates.year, downcast='integer')
+        orders['month'] = pd.to_numeric(purchase_dates.month, downcast='integer')
+
+        # Low-cardinality labels as categoricals (status filters compare codes)
+        orders['order_status'] = orders['order_status'].astype('category')
 
-        # Add year and month columns for easier filtering
-        orders['year'] = orders['order_purchase_timestamp'].dt.year
-        orders['month'] = orders['order_purchase_timestamp'].dt.month
+        # Index by order_id once so sales merges are index joins
+        orders = orders.set_index('order_id')
 
         self._datasets['orders'] = orders
+        self._sales_data.clear()
         return orders
 
     def load_order_items(self) -> pd.DataFrame:
@@ -58,15 +190,13 @@ class DataLoader:
         Load and process order items dataset.
 
         Returns:
-            DataFrame with processed order items data
+            DataFrame with processed order items data, indexed by order_id
         """
-        order_items = pd.read_csv(f'{self.data_path}/order_items_dataset.csv')
-        order_items['shipping_limit_date'] = pd.to_datetime(
-            order_items['shipping_limit_date'],
-            errors='coerce'
-        )
+        order_items = self._read_dataset('order_items_dataset', ['shipping_limit_date'])
+        order_items = order_items.set_index('order_id')
 
         self._datasets['order_items'] = order_items
+        self._sales_data.clear()
         return order_items
 
     def load_products(self) -> pd.DataFrame:
@@ -76,7 +206,8 @@ class DataLoader:
         Returns:
             DataFrame with processed products data
         """
-        products = pd.read_csv(f'{self.data_path}/products_dataset.csv')
+        products = self._read_dataset('products_dataset')
+        products['product_category_name'] = products['product_category_name'].astype('category')
         self._datasets['products'] = products
         return products
 
@@ -87,7 +218,9 @@ class DataLoader:
         Returns:
             DataFrame with processed customers data
         """
-        customers = pd.read_csv(f'{self.data_path}/customers_dataset.csv')
+        customers = self._read_dataset('customers_dataset')
+        for col in ('customer_state', 'customer_city'):
+            customers[col] = customers[col].astype('category')
         self._datasets['customers'] = customers
         return customers
 
@@ -98,17 +231,16 @@ class DataLoader:
         Returns:
             DataFrame with processed reviews data
         """
-        reviews = pd.read_csv(f'{self.data_path}/order_reviews_dataset.csv')
-        reviews['review_creation_date'] = pd.to_datetime(
-            reviews['review_creation_date'],
-            errors='coerce'
-        )
-        reviews['review_answer_timestamp'] = pd.to_datetime(
-            reviews['review_answer_timestamp'],
-            errors='coerce'
+        reviews = self._read_dataset(
+            'order_reviews_dataset',
+            ['review_creation_date', 'review_answer_timestamp']
         )
 
+        # Scores are 1-5; prices stay float64 so revenue sums keep their cents
+        reviews['review_score'] = pd.to_numeric(reviews['review_score'], downcast='integer')
+
         self._datasets['reviews'] = reviews
+        self._order_reviews = None
         return reviews
 
     def load_payments(self) -> pd.DataFrame:
@@ -118,7 +250,7 @@ class DataLoader:
         Returns:
             DataFrame with processed payments data
         """
-        payments = pd.read_csv(f'{self.data_path}/order_payments_dataset.csv')
+        payments = self._read_dataset('order_payments_dataset')
         self._datasets['payments'] = payments
         return payments
 
@@ -135,9 +267,35 @@ class DataLoader:
         self.load_customers()
         self.load_reviews()
         self.load_payments()
+        self._encode_keys()
 
         return self._datasets
 
+    def _encode_keys(self) -> None:
+        """
+        Convert the shared key columns of loaded datasets to categoricals.
+
+        All tables holding a key use the same categories, so their codes
+        line up and joins on that key compare integers instead of strings.
+        """
+        for key, names in KEY_COLUMNS.items():
+            tables = [self._datasets[name] for name in names if name in self._datasets]
+            values = [table.index if table.index.name == key else table[key]
+                      for table in tables]
+
+            categories = pd.Index(
+                pd.unique(pd.concat([pd.Series(v.to_numpy()) for v in values]))
+            ).dropna()
+
+            for table in tables:
+                if table.index.name == key:
+                    table.index = pd.CategoricalIndex(table.index, categories=categories, name=key)
+                else:
+                    table[key] = pd.Categorical(table[key], categories=categories)
+
+        self._sales_data.clear()
+        self._order_reviews = None
+
     def create_sales_data(self,
                          start_date: Optional[str] = None,
                          end_date: Optional[str] = None,
@@ -151,39 +309,51 @@ class DataLoader:
             status_filter: Order status to filter ('delivered', 'all', or specific status)
 
         Returns:
-            DataFrame with merged and filtered sales data
+            DataFrame with merged and filtered sales data. Results are cached
+            per filter combination and shared between calls, so callers must
+            not modify them in place.
         """
+        key = (start_date, end_date, status_filter)
+        if key in self._sales_data:
+            return self._sales_data[key]
+
         # Ensure datasets are loaded
         if 'orders' not in self._datasets:
             self.load_orders()
         if 'order_items' not in self._datasets:
             self.load_order_items()
 
-        orders = self._datasets['orders'].copy()
-        order_items = self._datasets['order_items'].copy()
+        # Read-only references; the merge below builds a new frame
+        orders = self._datasets['orders']
+        order_items = self._datasets['order_items']
 
-        # Merge orders with order items
-        sales_data = pd.merge(
-            left=order_items[['order_id', 'order_item_id', 'product_id', 'price', 'freight_value']],
-            right=orders[['order_id', 'customer_id', 'order_status',
-                         'order_purchase_timestamp', 'order_delivered_customer_date',
-                         'year', 'month']],
-            on='order_id',
-            how='left'
-        )
-
-        # Apply status filter
+        # Apply status and date filters to orders before the merge, so only
+        # matching orders (and only the needed columns) are joined
+        mask = None
         if status_filter != 'all':
-            sales_data = sales_data[sales_data['order_status'] == status_filter].copy()
+            mask = orders['order_status'] == status_filter
 
-        # Apply date filters
         if start_date:
             start_dt = pd.to_datetime(start_date)
-            sales_data = sales_data[sales_data['order_purchase_timestamp'] >= start_dt]
+            start_mask = orders['order_purchase_timestamp'] >= start_dt
+            mask = start_mask if mask is None else mask & start_mask
 
         if end_date:
             end_dt = pd.to_datetime(end_date)
-            sales_data = sales_data[sales_data['order_purchase_timestamp'] <= end_dt]
+            end_mask = orders['order_purchase_timestamp'] <= end_dt
+            mask = end_mask if mask is None else mask & end_mask
+
+        order_columns = ['customer_id', 'order_status',
+                         'order_purchase_timestamp', 'order_delivered_customer_date',
+                         'year', 'month']
+        orders = orders[order_columns] if mask is None else orders.loc[mask, order_columns]
+
+        # Join order items to orders on the shared order_id index; items of
+        # filtered-out orders are dropped by the inner join
+        sales_data = order_items[['order_item_id', 'product_id', 'price', 'freight_value']].join(
+            orders,
+            how='left' if mask is None else 'inner'
+        ).reset_index()
 
         # Add delivery time calculation for delivered orders
         if status_filter == 'delivered':
@@ -195,22 +365,27 @@ class DataLoader:
                 sales_data['order_purchase_timestamp']
             ).dt.days
 
+        self._sales_data[key] = sales_data
         return sales_data
 
     def create_sales_with_products(self,
                                   start_date: Optional[str] = None,
-                                  end_date: Optional[str] = None) -> pd.DataFrame:
+                                  end_date: Optional[str] = None,
+                                  sales_data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         Create sales data merged with product information.
 
         Args:
             start_date: Start date for filtering (YYYY-MM-DD format)
             end_date: End date for filtering (YYYY-MM-DD format)
+            sales_data: Already merged sales data to use instead of calling
+                create_sales_data (the date arguments are then ignored)
 
         Returns:
             DataFrame with sales and product data
         """
-        sales_data = self.create_sales_data(start_date, end_date)
+        if sales_data is None:
+            sales_data = self.create_sales_data(start_date, end_date)
 
         if 'products' not in self._datasets:
             self.load_products()
@@ -228,18 +403,22 @@ class DataLoader:
 
     def create_sales_with_geography(self,
                                    start_date: Optional[str] = None,
-                                   end_date: Optional[str] = None) -> pd.DataFrame:
+                                   end_date: Optional[str] = None,
+                                   sales_data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         Create sales data merged with customer geographic information.
 
         Args:
             start_date: Start date for filtering (YYYY-MM-DD format)
             end_date: End date for filtering (YYYY-MM-DD format)
+            sales_data: Already merged sales data to use instead of calling
+                create_sales_data (the date arguments are then ignored)
 
         Returns:
             DataFrame with sales and geographic data
         """
-        sales_data = self.create_sales_data(start_date, end_date)
+        if sales_data is None:
+            sales_data = self.create_sales_data(start_date, end_date)
 
         if 'customers' not in self._datasets:
             self.load_customers()
@@ -255,6 +434,28 @@ class DataLoader:
 
         return sales_with_geography
 
+    def get_order_reviews(self) -> pd.DataFrame:
+        """
+        Get the review score of each order.
+
+        The reviews are de-duplicated once (first review per order) and the
+        result is reused by later calls until the reviews are reloaded.
+
+        Returns:
+            DataFrame with a review_score column, indexed by order_id
+        """
+        if self._order_reviews is None:
+            if 'reviews' not in self._datasets:
+                self.load_reviews()
+
+            self._order_reviews = (
+                self._datasets['reviews'][['order_id', 'review_score']]
+                .drop_duplicates(subset=['order_id'])
+                .set_index('order_id')
+            )
+
+        return self._order_reviews
+
     def filter_by_date_range(self,
                             df: pd.DataFrame,
                             date_column: str,
@@ -272,18 +473,22 @@ class DataLoader:
         Returns:
             Filtered DataFrame
         """
-        df_filtered = df.copy()
-
-        # Ensure date column is datetime
-        df_filtered[date_column] = pd.to_datetime(df_filtered[date_column])
+        # Convert only the date column, leaving the input frame untouched
+        dates = pd.to_datetime(df[date_column])
+        mask = pd.Series(True, index=df.index)
 
         if start_date:
             start_dt = pd.to_datetime(start_date)
-            df_filtered = df_filtered[df_filtered[date_column] >= start_dt]
+            mask &= dates >= start_dt
 
         if end_date:
             end_dt = pd.to_datetime(end_date)
-            df_filtered = df_filtered[df_filtered[date_column] <= end_dt]
+            mask &= dates <= end_dt
+
+        # Boolean indexing already returns a new frame
+        df_filtered = df[mask]
+        if dates.dtype != df[date_column].dtype:
+            df_filtered = df_filtered.assign(**{date_column: dates[mask]})
 
         return df_filtered
 
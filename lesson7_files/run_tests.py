@@ -9,40 +9,17 @@ and manage the testing process.
 import argparse
 import subprocess
 import sys
-import time
-import requests
 from pathlib import Path
 
 
-def check_streamlit_server(url="http://localhost:8502", timeout=30):
-    """Check if Streamlit server is running."""
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            response = requests.get(url, timeout=2)
-            if response.status_code == 200:
-                return True
-        except (requests.exceptions.RequestException, requests.exceptions.ConnectionError):
-            time.sleep(1)
-    return False
-
-
-def start_streamlit_server():
-    """Start Streamlit server in background."""
-    print("Starting Streamlit server...")
-    process = subprocess.Popen(
-        ["uv", "run", "streamlit", "run", "dashboard.py", "--server.port=8502", "--server.headless=true"],
+def xdist_available():
+    """Check whether pytest-xdist is installed in the project environment."""
+    result = subprocess.run(
+        ["uv", "run", "python", "-c", "import xdist"],
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL
     )
-
-    # Wait for server to start
-    if check_streamlit_server():
-        print("✓ Streamlit server started successfully")
-        return process
-    else:
-        process.terminate()
-        raise RuntimeError("Failed to start Streamlit server")
+    return result.returncode == 0
 
 
 def run_tests(test_type="all", verbose=False, browser="chromium"):
@@ -57,6 +34,11 @@ def run_tests(test_type="all", verbose=False, browser="chromium"):
         # Note: This would require additional setup for other browsers
         print(f"Note: Browser selection ({browser}) not implemented, using default")
 
+    # Spread tests across cores; each worker starts its own server on its
+    # own port, and the visual tests are grouped onto a single worker
+    if xdist_available():
+        cmd.extend(["-n", "auto", "--dist=loadgroup"])
+
     if test_type == "core":
         cmd.append("tests/test_dashboard_core.py")
     elif test_type == "interactions":
@@ -95,11 +77,6 @@ def main():
         default="chromium",
         help="Browser to use for testing"
     )
-    parser.add_argument(
-        "--no-server",
-        action="store_true",
-        help="Don't start Streamlit server (assume it's already running)"
-    )
 
     args = parser.parse_args()
 
@@ -108,35 +85,16 @@ def main():
         print("Error: dashboard.py not found. Please run from the project root.")
         sys.exit(1)
 
-    # Check if server is already running
-    server_process = None
-    if not args.no_server:
-        if check_streamlit_server():
-            print("✓ Streamlit server already running")
-        else:
-            try:
-                server_process = start_streamlit_server()
-            except RuntimeError as e:
-                print(f"Error: {e}")
-                sys.exit(1)
-
-    try:
-        # Run tests
-        success = run_tests(args.type, args.verbose, args.browser)
-
-        if success:
-            print("\n✓ All tests passed!")
-            sys.exit(0)
-        else:
-            print("\n✗ Some tests failed")
-            sys.exit(1)
-
-    finally:
-        # Cleanup
-        if server_process:
-            print("Stopping Streamlit server...")
-            server_process.terminate()
-            server_process.wait()
+    # The pytest fixtures start (or reuse) the Streamlit server for each
+    # worker, so there is no server to manage here
+    success = run_tests(args.type, args.verbose, args.browser)
+
+    if success:
+        print("\n✓ All tests passed!")
+        sys.exit(0)
+    else:
+        print("\n✗ Some tests failed")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
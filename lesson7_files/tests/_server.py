@@ -0,0 +1,148 @@
+"""
+Launch, probe and stop the Streamlit server used by the dashboard tests.
+
+Used by the ``streamlit_server`` fixture, which starts one server per
+test process on first use.
+"""
+
+import collections
+import os
+import random
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+
+DEFAULT_PORT = int(os.environ.get("STREAMLIT_PORT", 8502))
+DEFAULT_URL = f"http://localhost:{DEFAULT_PORT}"
+# Server output lines kept for diagnosing a failed start
+OUTPUT_TAIL_LINES = 200
+
+# Test runs never edit the app or need telemetry, so skip the file watcher,
+# usage stats and browser-facing protections
+SERVER_FLAGS = [
+    "--server.headless=true",
+    "--server.fileWatcherType=none",
+    "--server.runOnSave=false",
+    "--server.enableCORS=false",
+    "--server.enableXsrfProtection=false",
+    "--browser.gatherUsageStats=false",
+    "--global.developmentMode=false",
+]
+
+# Each worker's server keeps its data cache in memory; persisting it to disk
+# would have every worker write the same pickle concurrently
+SERVER_ENV = {**os.environ, "DASHBOARD_PERSIST_CACHE": "0"}
+
+# One pooled connection reused by every readiness probe
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0))
+
+
+def streamlit_server_answers(url=DEFAULT_URL):
+    """Probe ``url`` once: True if a server accepts connections and replies 200."""
+    parts = urlsplit(url)
+    address = (parts.hostname or "localhost", parts.port or 80)
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.1)
+        if sock.connect_ex(address) != 0:
+            return False
+    try:
+        return _SESSION.get(url, timeout=2).status_code == 200
+    except requests.exceptions.RequestException:
+        return False
+
+
+def check_streamlit_server(url=DEFAULT_URL, timeout=30, process=None):
+    """Check if Streamlit server is running.
+
+    Probes the port with a non-blocking connect, backing off from 50ms up to
+    1s between attempts, and confirms with a single HTTP request once the
+    socket accepts connections. When ``process`` is given, gives up as soon
+    as it exits.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        if streamlit_server_answers(url):
+            return True
+        time.sleep(min(delay * random.uniform(0.8, 1.2), max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 2, 1.0)
+    return False
+
+
+def spawn_streamlit(port=DEFAULT_PORT, timeout=30):
+    """Start Streamlit on ``port`` and wait until it answers.
+
+    Returns:
+        (process, url) for the running server.
+
+    Raises:
+        RuntimeError: If ``port`` is already served by another process, or the
+            server does not come up within ``timeout`` seconds.
+    """
+    url = f"http://localhost:{port}"
+    # Streamlit exits when its port is taken, and the probe would then be
+    # answered by whatever holds the port
+    if streamlit_server_answers(url):
+        raise RuntimeError(f"Port {port} is already in use")
+
+    process = subprocess.Popen(
+        ["uv", "run", "streamlit", "run", "dashboard.py", f"--server.port={port}", *SERVER_FLAGS],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env=SERVER_ENV
+    )
+
+    # Keep draining the pipe so the server never blocks on a full buffer
+    output_tail = collections.deque(maxlen=OUTPUT_TAIL_LINES)
+    reader = threading.Thread(target=output_tail.extend, args=(process.stdout,), daemon=True)
+    reader.start()
+
+    # Wait for server to start
+    if not check_streamlit_server(url, timeout=timeout, process=process) or process.poll() is not None:
+        stop_streamlit(process)
+        reader.join(timeout=1)
+        sys.stderr.write("".join(output_tail))
+        raise RuntimeError("Streamlit server failed to start")
+    return process, url
+
+
+def stop_streamlit(process, timeout=10):
+    """Terminate the Streamlit server and wait for it to exit.
+
+    Uses a pidfd where the platform supports it, so the signal cannot reach a
+    recycled PID and the wait blocks in poll() instead of sleeping in a loop.
+    Falls back to terminate()/wait() elsewhere. The process is killed if it
+    has not exited after ``timeout`` seconds.
+    """
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        process.terminate()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        return
+
+    try:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+        signal.pidfd_send_signal(pidfd, signal.SIGTERM)
+        if not poller.poll(timeout * 1000):
+            signal.pidfd_send_signal(pidfd, signal.SIGKILL)
+            poller.poll()
+    finally:
+        os.close(pidfd)
+    process.wait()
@@ -2,21 +2,45 @@
 Pytest configuration and fixtures for Streamlit dashboard testing.
 """
 
-import asyncio
-import subprocess
-import time
+import os
 from typing import Generator
 import pytest
-from playwright.async_api import Browser, BrowserContext, Page, Playwright, async_playwright
-import requests
+from playwright.async_api import Browser, BrowserContext, Locator, Page, Playwright, async_playwright, expect
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
+from tests._server import DEFAULT_PORT, spawn_streamlit, stop_streamlit, streamlit_server_answers
 
-@pytest.fixture(scope="session")
-def event_loop():
-    """Create an instance of the default event loop for the test session."""
-    loop = asyncio.new_event_loop()
-    yield loop
-    loop.close()
+DEFAULT_VIEWPORT = {'width': 1280, 'height': 720}
+DATE_FILTER_LABELS = ("Start Date", "End Date")
+
+# Skip Chromium subsystems the dashboard tests never touch
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--mute-audio',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--no-first-run',
+    '--disable-features=TranslateUI',
+]
+
+# Set HEADED=1 to watch the browser while debugging
+HEADLESS = os.environ.get("HEADED", "0") != "1"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def screenshot_directory():
+    """Ensure screenshot directory exists before any test writes to it."""
+    os.makedirs("tests/screenshots", exist_ok=True)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def expect_timeout():
+    """Give auto-retrying expect() assertions a 5s budget."""
+    expect.set_options(timeout=5000)
 
 
 @pytest.fixture(scope="session")
@@ -27,69 +51,81 @@ async def playwright() -> Generator[Playwright, None, None]:
 
 
 @pytest.fixture(scope="session")
-async def browser(playwright: Playwright) -> Generator[Browser, None, None]:
+def headless() -> bool:
+    """Whether the browser runs without a window."""
+    return HEADLESS
+
+
+@pytest.fixture(scope="session")
+async def browser(playwright: Playwright, headless: bool) -> Generator[Browser, None, None]:
     """Launch browser."""
-    browser = await playwright.chromium.launch(
-        headless=True,
-        args=['--no-sandbox', '--disable-dev-shm-usage']
-    )
+    browser = await playwright.chromium.launch(headless=headless, args=CHROMIUM_ARGS)
     yield browser
     await browser.close()
 
 
-@pytest.fixture
-async def context(browser: Browser) -> Generator[BrowserContext, None, None]:
-    """Create browser context."""
-    context = await browser.new_context(
-        viewport={'width': 1280, 'height': 720},
+async def _new_context(browser: Browser) -> BrowserContext:
+    """Create a browser context with the dashboard test settings."""
+    return await browser.new_context(
+        viewport=DEFAULT_VIEWPORT,
         ignore_https_errors=True
     )
+
+
+@pytest.fixture(scope="session")
+async def shared_context(browser: Browser) -> Generator[BrowserContext, None, None]:
+    """Create browser context shared by the read-only tests."""
+    context = await _new_context(browser)
     yield context
     await context.close()
 
 
 @pytest.fixture
-async def page(context: BrowserContext) -> Generator[Page, None, None]:
-    """Create page."""
-    page = await context.new_page()
+async def isolated_context(browser: Browser) -> Generator[BrowserContext, None, None]:
+    """Create a fresh browser context for tests that change cookies or storage."""
+    context = await _new_context(browser)
+    yield context
+    await context.close()
+
+
+@pytest.fixture(scope="session")
+async def page(shared_context: BrowserContext) -> Generator[Page, None, None]:
+    """Create page shared by the whole session."""
+    page = await shared_context.new_page()
     yield page
     await page.close()
 
 
-@pytest.fixture(scope="session")
-def streamlit_server():
-    """Start Streamlit server for testing."""
-    # Start streamlit server
-    process = subprocess.Popen(
-        ["uv", "run", "streamlit", "run", "dashboard.py", "--server.port=8502", "--server.headless=true"],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
+def _streamlit_port() -> int:
+    """Pick a port per pytest-xdist worker so parallel servers don't collide."""
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+    return DEFAULT_PORT + int(worker.lstrip("gw") or 0)
 
-    # Wait for server to start
-    max_attempts = 30
-    for _ in range(max_attempts):
-        try:
-            response = requests.get("http://localhost:8502", timeout=1)
-            if response.status_code == 200:
-                break
-        except (requests.exceptions.RequestException, requests.exceptions.ConnectionError):
-            time.sleep(1)
-    else:
-        process.terminate()
-        raise RuntimeError("Streamlit server failed to start")
 
-    yield "http://localhost:8502"
+@pytest.fixture(scope="session")
+def streamlit_server() -> Generator[str, None, None]:
+    """URL of the Streamlit server for this test process.
 
-    # Cleanup
-    process.terminate()
-    process.wait()
+    Started on first use, so runs without UI tests (and the xdist
+    controller) never boot one. A server already answering on this
+    process's port is reused and left running.
+    """
+    port = _streamlit_port()
+    url = f"http://localhost:{port}"
+    if streamlit_server_answers(url):
+        yield url
+        return
 
+    process, url = spawn_streamlit(port)
+    try:
+        yield url
+    finally:
+        stop_streamlit(process)
 
-@pytest.fixture
-async def dashboard_page(page: Page, streamlit_server: str) -> Page:
-    """Navigate to dashboard and wait for it to load."""
-    await page.goto(streamlit_server)
+
+async def _load_dashboard(page: Page, url: str) -> Page:
+    """Navigate to the dashboard and wait for it to load."""
+    await page.goto(url)
 
     # Wait for dashboard to load - look for the main header
     await page.wait_for_selector("text=E-commerce Analytics Dashboard", timeout=30000)
@@ -100,32 +136,163 @@ async def dashboard_page(page: Page, streamlit_server: str) -> Page:
     return page
 
 
+@pytest.fixture(scope="session")
+async def default_filters(page: Page, streamlit_server: str) -> dict:
+    """Load the dashboard on the shared page once and record its default dates."""
+    await _load_dashboard(page, streamlit_server)
+    return await StreamlitHelpers.get_date_filters(page)
+
+
+@pytest.fixture
+async def dashboard_page(page: Page, default_filters: dict) -> Page:
+    """Dashboard with the viewport and date filters back at their defaults.
+
+    The page is loaded once per session; between tests only the state a test
+    can change is undone, which is much cheaper than a Streamlit cold start.
+    """
+    await page.set_viewport_size(DEFAULT_VIEWPORT)
+    await StreamlitHelpers.reset_filters(page, default_filters)
+    return page
+
+
+@pytest.fixture
+async def isolated_dashboard_page(shared_context: BrowserContext, warm_dashboard_page: Page,
+                                  streamlit_server: str) -> Generator[Page, None, None]:
+    """Freshly loaded dashboard on a page of its own.
+
+    For tests that reload, resize or otherwise reshape the page. Viewport
+    and reloads are per page, so the page lives in the shared context and
+    gets Streamlit's and Plotly's JS from the HTTP cache that
+    ``warm_dashboard_page`` already filled.
+    """
+    page = await shared_context.new_page()
+    yield await _load_dashboard(page, streamlit_server)
+    await page.close()
+
+
+@pytest.fixture(scope="session")
+async def warm_dashboard_page(shared_context: BrowserContext, streamlit_server: str) -> Generator[Page, None, None]:
+    """Dashboard loaded once for read-only tests.
+
+    Lives on its own page so tests using ``dashboard_page`` cannot leave it
+    in a changed state. Tests taking this fixture must not interact with it.
+    """
+    page = await shared_context.new_page()
+    await _load_dashboard(page, streamlit_server)
+
+    # Plotly's bundle loads with the first chart; waiting here primes the cache
+    await page.wait_for_selector(".plotly-graph-div", timeout=15000)
+    yield page
+    await page.close()
+
+
 class StreamlitHelpers:
     """Helper methods for interacting with Streamlit components."""
 
+    @staticmethod
+    def metric_card_locator(page: Page, metric_name: str) -> Locator:
+        """Locate a KPI card by the test id derived from its title."""
+        return page.get_by_test_id(f"kpi-{metric_name.lower().replace(' ', '-')}")
+
+    @staticmethod
+    def metric_value_locator(page: Page, metric_name: str) -> Locator:
+        """Locate the value element of a specific metric card."""
+        return StreamlitHelpers.metric_card_locator(page, metric_name).locator(".big-font")
+
     @staticmethod
     async def get_metric_value(page: Page, metric_name: str) -> str:
         """Get the value of a specific metric card."""
-        metric_card = page.locator(f".metric-card:has(h4:text('{metric_name}'))")
-        big_font_element = metric_card.locator(".big-font")
-        return await big_font_element.text_content()
+        return await StreamlitHelpers.metric_value_locator(page, metric_name).text_content()
 
     @staticmethod
     async def get_trend_indicator(page: Page, metric_name: str) -> str:
         """Get the trend indicator for a specific metric."""
-        metric_card = page.locator(f".metric-card:has(h4:text('{metric_name}'))")
+        metric_card = StreamlitHelpers.metric_card_locator(page, metric_name)
         trend_element = metric_card.locator(".trend-positive, .trend-negative")
         return await trend_element.text_content()
 
     @staticmethod
-    async def set_date_input(page: Page, label: str, date: str) -> None:
-        """Set a date input field."""
-        # Find the date input by its label
-        date_input = page.locator(f"label:has-text('{label}') + div input")
+    async def snapshot_metrics(page: Page) -> dict:
+        """Read every metric and bottom card in one round-trip.
+
+        Returns a dict keyed by card title, each entry holding the card's
+        ``value`` and ``trend`` text (None when absent) and ``visible``.
+        """
+        return await page.evaluate("""() => {
+            const out = {};
+            for (const card of document.querySelectorAll('.metric-card, .bottom-card')) {
+                const title = card.querySelector('h4')?.innerText.trim();
+                if (!title) continue;
+                out[title] = {
+                    value: card.querySelector('.big-font')?.innerText ?? null,
+                    trend: card.querySelector('.trend-positive, .trend-negative')?.innerText ?? null,
+                    visible: card.checkVisibility(),
+                };
+            }
+            return out;
+        }""")
+
+    @staticmethod
+    def date_input_locator(page: Page, label: str) -> Locator:
+        """Locate a date input field by its label."""
+        return page.locator(f"label:has-text('{label}') + div input")
+
+    @staticmethod
+    async def get_date_filters(page: Page) -> dict:
+        """Get the current value of each date filter, keyed by label."""
+        return {label: await StreamlitHelpers.date_input_locator(page, label).input_value()
+                for label in DATE_FILTER_LABELS}
+
+    @staticmethod
+    async def reset_filters(page: Page, defaults: dict) -> None:
+        """Set any date filter that has changed back to its default."""
+        current = await StreamlitHelpers.get_date_filters(page)
+        changed = {label: value for label, value in defaults.items() if current[label] != value}
+        for label, value in changed.items():
+            await StreamlitHelpers.fill_date_input(page, label, value)
+        if changed:
+            await StreamlitHelpers.apply_filters(page)
+
+    @staticmethod
+    async def fill_date_input(page: Page, label: str, date: str) -> None:
+        """Type a date into a filter field without applying it."""
+        date_input = StreamlitHelpers.date_input_locator(page, label)
         await date_input.clear()
         await date_input.fill(date)
         await date_input.press("Enter")
-        await page.wait_for_timeout(1000)  # Wait for Streamlit to process
+
+    @staticmethod
+    async def apply_filters(page: Page) -> None:
+        """Submit the filter form and wait for the resulting rerun."""
+        await page.get_by_role("button", name="Apply").click()
+        await StreamlitHelpers.wait_for_script_run(page)
+
+    @staticmethod
+    async def set_date_input(page: Page, label: str, date: str) -> None:
+        """Set a date input field."""
+        await StreamlitHelpers.fill_date_input(page, label, date)
+        await StreamlitHelpers.apply_filters(page)
+
+    @staticmethod
+    async def set_date_range(page: Page, start: str, end: str) -> None:
+        """Set both date filters and apply them in a single rerun."""
+        await StreamlitHelpers.fill_date_input(page, "Start Date", start)
+        await StreamlitHelpers.fill_date_input(page, "End Date", end)
+        await StreamlitHelpers.apply_filters(page)
+
+    @staticmethod
+    async def wait_for_script_run(page: Page, start_timeout: int = 1000) -> None:
+        """Wait for the Streamlit rerun triggered by a widget change to finish."""
+        app = "[data-testid='stApp']"
+        # The rerun starts a few ms after the widget event; an unchanged value
+        # never starts one, so give up on seeing it after start_timeout.
+        try:
+            await page.wait_for_selector(f"{app}[data-test-script-state='running']",
+                                         state="attached", timeout=start_timeout)
+        except PlaywrightTimeoutError:
+            pass
+        await page.wait_for_selector(f"{app}[data-test-script-state='notRunning']",
+                                     state="attached", timeout=30000)
 
     @staticmethod
     async def wait_for_charts_to_load(page: Page) -> None:
@@ -133,17 +300,51 @@ class StreamlitHelpers:
         # Wait for plotly graphs to be present
         await page.wait_for_selector(".plotly-graph-div", timeout=10000)
 
-        # Wait a bit more for charts to fully render
-        await page.wait_for_timeout(2000)
+        # Wait until every chart has drawn its SVG
+        await page.wait_for_function("""() => {
+            const graphs = [...document.querySelectorAll('.plotly-graph-div')];
+            return graphs.length > 0 && graphs.every(g => {
+                const svg = g.querySelector('svg.main-svg');
+                return svg !== null && svg.getBBox().width > 0;
+            });
+        }""", timeout=10000)
 
     @staticmethod
-    async def check_chart_exists(page: Page, chart_title: str) -> bool:
-        """Check if a chart with given title exists."""
-        chart_header = page.locator(f"h4:text('{chart_title}')")
-        return await chart_header.is_visible()
+    async def get_visible_headings(page: Page) -> set[str]:
+        """Return the text of every visible heading in one DOM query."""
+        headings = await page.evaluate("""() => [...document.querySelectorAll('h1, h2, h3, h4')]
+            .filter(h => h.checkVisibility())
+            .map(h => h.innerText.trim())""")
+        return set(headings)
+
+    @staticmethod
+    async def count_elements(page: Page, *selectors: str) -> dict[str, int]:
+        """Count matches for several selectors in one DOM query."""
+        return await page.evaluate(
+            "(selectors) => Object.fromEntries(selectors.map(s => [s, document.querySelectorAll(s).length]))",
+            list(selectors),
+        )
 
 
 @pytest.fixture
 def streamlit_helpers():
     """Provide helper methods for Streamlit testing."""
-    return StreamlitHelpers
\ No newline at end of file
+    return StreamlitHelpers
+
+
+@pytest.fixture(scope="session")
+async def dom_snapshot(warm_dashboard_page: Page) -> dict:
+    """Structural stats of the loaded dashboard, gathered in one DOM pass."""
+    await StreamlitHelpers.wait_for_charts_to_load(warm_dashboard_page)
+    return await warm_dashboard_page.evaluate("""() => {
+        const all = (selector) => [...document.querySelectorAll(selector)];
+        return {
+            chart_titles: all('h4').filter(h => h.checkVisibility()).map(h => h.innerText.trim()),
+            plotly_count: all('.plotly-graph-div').length,
+            svg_counts: all('.plotly-graph-div').map(g => g.querySelectorAll('svg').length),
+            metric_card_count: all('.metric-card').length,
+            big_font_count: all('.big-font').length,
+            trend_count: all('.trend-positive, .trend-negative').length,
+            errors: all('.stAlert, .stException, .stError').map(e => e.textContent),
+        };
+    }""")
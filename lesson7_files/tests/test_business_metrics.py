@@ -0,0 +1,62 @@
+"""
+Unit tests for the BusinessMetrics date filtering.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from business_metrics import BusinessMetrics
+
+
+@pytest.fixture
+def metrics_with_missing_timestamp() -> BusinessMetrics:
+    """Metrics over five orders, the last one without a purchase timestamp."""
+    sales = pd.DataFrame({
+        'order_id': ['a', 'b', 'c', 'd', 'e'],
+        'order_purchase_timestamp': pd.to_datetime(['2022-12-01', '2023-02-01', '2023-03-01', '2023-04-01', None]),
+        'price': [1.0, 5.0, 2.0, 3.0, 4.0],
+        'delivery_days': [5.0, 10.0, np.nan, 10.0, 4.0],
+        'review_score': [5, 4, np.nan, 3, 1],
+        'order_delivered_customer_date': pd.to_datetime(
+            ['2022-12-06', '2023-02-11', None, '2023-04-11', '2023-05-05']
+        ),
+        'order_estimated_delivery_date': pd.to_datetime(
+            ['2022-12-10', '2023-02-08', '2023-03-10', '2023-04-08', '2023-05-10']
+        ),
+    })
+    return BusinessMetrics(sales)
+
+
+@pytest.mark.unit
+class TestDateFiltering:
+    """Test that date filters exclude rows without a purchase timestamp."""
+
+    def test_start_only_filter_skips_missing_timestamps(self, metrics_with_missing_timestamp: BusinessMetrics):
+        """A start date alone must not pull in NaT rows sorted to the end."""
+        assert metrics_with_missing_timestamp.calculate_total_revenue('2023-01-01') == 10.0
+
+    def test_end_only_filter_skips_missing_timestamps(self, metrics_with_missing_timestamp: BusinessMetrics):
+        """An end date alone keeps every dated row up to it."""
+        assert metrics_with_missing_timestamp.calculate_total_revenue(None, '2023-12-31') == 11.0
+
+    def test_unfiltered_total_keeps_every_row(self, metrics_with_missing_timestamp: BusinessMetrics):
+        """Without a date range all rows count, as before."""
+        assert metrics_with_missing_timestamp.calculate_total_revenue() == 15.0
+
+    def test_unfiltered_delivery_metrics_keep_every_row(self, metrics_with_missing_timestamp: BusinessMetrics):
+        """Without a date range the NaT row still counts towards delivery times."""
+        delivery = metrics_with_missing_timestamp.calculate_delivery_performance()
+        assert delivery['avg_delivery_days'] == 7.25
+        assert delivery['total_orders_delivered'] == 4
+
+    def test_unfiltered_review_metrics_keep_every_row(self, metrics_with_missing_timestamp: BusinessMetrics):
+        """Without a date range the NaT row still counts towards reviews."""
+        reviews = metrics_with_missing_timestamp.calculate_review_metrics()
+        assert reviews['total_reviews'] == 4
+        assert reviews['avg_review_score'] == 3.25
+
+    def test_on_time_rate_counts_missing_delivery_dates_as_late(self, metrics_with_missing_timestamp: BusinessMetrics):
+        """Orders without a delivered date stay in the on-time denominator."""
+        delivery = metrics_with_missing_timestamp.calculate_delivery_performance()
+        assert delivery['on_time_rate'] == 40.0